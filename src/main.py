@@ -3,44 +3,141 @@ import json
 import os
 import random
 import hashlib
+import hmac
 import math
+import mmap
 import platform
+import sys
+import time
 import tkinter as tk
+from collections import deque
 from dataclasses import dataclass
 from tkinter import messagebox, ttk
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Collection, Dict, FrozenSet, List, Optional, Tuple, Union
+
+try:
+    import orjson
+except ImportError:
+    # Optional speed-up; the standard json module is used otherwise.
+    orjson = None
 
 DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
 USERS_FILE = os.path.join(DATA_DIR, "users.json")
 CONFIG_FILE = os.path.join(DATA_DIR, "config.json")
-
-ALLOWED_BETS = [0.5, 1.0, 2.0, 5.0, 10.0, 25.0]
-MIN_INSIDE_BET = 0.5
-MIN_OUTSIDE_BET = 5.0
-
-RED_NUMBERS = {
+JOURNAL_FILE = os.path.join(DATA_DIR, "journal.ndjson")
+# Number of journaled balance changes after which users.json is rewritten.
+SNAPSHOT_EVERY = 50
+
+# Balances and bet amounts are handled in integer cents.
+ALLOWED_BETS = [50, 100, 200, 500, 1000, 2500]
+MIN_INSIDE_BET = 50
+MIN_OUTSIDE_BET = 500
+
+PASSWORD_KDF = "scrypt"
+SCRYPT_PARAMS = {"n": 2 ** 15, "r": 8, "p": 1}
+SCRYPT_MAXMEM = 64 * 1024 * 1024
+SALT_BYTES = 16
+# Per-process key for remembering successful logins without keeping the password.
+AUTH_CACHE_KEY = os.urandom(32)
+# Keyed once; auth_token copies it instead of re-keying a fresh HMAC per call.
+AUTH_CACHE_MAC = hmac.new(AUTH_CACHE_KEY, digestmod="sha256")
+
+RED_NUMBERS = frozenset({
     1, 3, 5, 7, 9, 12, 14, 16, 18,
     19, 21, 23, 25, 27, 30, 32, 34, 36,
-}
-BLACK_NUMBERS = {
+})
+BLACK_NUMBERS = frozenset({
     2, 4, 6, 8, 10, 11, 13, 15, 17,
     20, 22, 24, 26, 28, 29, 31, 33, 35,
+})
+
+WHEEL = tuple(sys.intern(number) for number in ("0", "00", *map(str, range(1, 37))))
+WHEEL_SET = frozenset(WHEEL)
+WHEEL_CENTER = 190
+WHEEL_RADIUS = 160
+WHEEL_XY = tuple(
+    (
+        WHEEL_CENTER + (WHEEL_RADIUS - 20) * math.cos(math.radians(360 / len(WHEEL) * idx)),
+        WHEEL_CENTER + (WHEEL_RADIUS - 20) * math.sin(math.radians(360 / len(WHEEL) * idx)),
+    )
+    for idx in range(len(WHEEL))
+)
+WHEEL_MARKER_BOXES = tuple((x - 12, y - 12, x + 12, y + 12) for x, y in WHEEL_XY)
+SLOT_BIT: Dict[str, int] = {number: idx for idx, number in enumerate(WHEEL)}
+
+# The wheel's own interned strings for 1..36, indexed by number - 1.
+NUMBER_STR = WHEEL[2:]
+
+RED_SEL = frozenset(NUMBER_STR[n - 1] for n in RED_NUMBERS)
+BLACK_SEL = frozenset(NUMBER_STR[n - 1] for n in BLACK_NUMBERS)
+EVEN_SEL = frozenset(NUMBER_STR[n - 1] for n in range(2, 37, 2))
+ODD_SEL = frozenset(NUMBER_STR[n - 1] for n in range(1, 37, 2))
+LOW_SEL = frozenset(NUMBER_STR[n - 1] for n in range(1, 19))
+HIGH_SEL = frozenset(NUMBER_STR[n - 1] for n in range(19, 37))
+DOZ1_SEL = frozenset(NUMBER_STR[n - 1] for n in range(1, 13))
+DOZ2_SEL = frozenset(NUMBER_STR[n - 1] for n in range(13, 25))
+DOZ3_SEL = frozenset(NUMBER_STR[n - 1] for n in range(25, 37))
+COL1_SEL = frozenset(NUMBER_STR[n - 1] for n in range(1, 37, 3))
+COL2_SEL = frozenset(NUMBER_STR[n - 1] for n in range(2, 37, 3))
+COL3_SEL = frozenset(NUMBER_STR[n - 1] for n in range(3, 37, 3))
+
+OUTSIDE_SELECTIONS: Dict[Tuple[str, str], FrozenSet[str]] = {
+    ("Red/Black", "red"): RED_SEL,
+    ("Red/Black", "black"): BLACK_SEL,
+    ("Gerade/Ungerade", "gerade"): EVEN_SEL,
+    ("Gerade/Ungerade", "ungerade"): ODD_SEL,
+    ("1-18/19-36", "1-18"): LOW_SEL,
+    ("1-18/19-36", "19-36"): HIGH_SEL,
+    ("Dutzend", "1-12"): DOZ1_SEL,
+    ("Dutzend", "13-24"): DOZ2_SEL,
+    ("Dutzend", "25-36"): DOZ3_SEL,
+    ("Kolonne", "1"): COL1_SEL,
+    ("Kolonne", "2"): COL2_SEL,
+    ("Kolonne", "3"): COL3_SEL,
 }
-
-WHEEL = ["0", "00"] + [str(n) for n in range(1, 37)]
-
-BET_TYPES = {
-    "Straight": {"payout": 35, "inside": True, "selection_count": 1},
-    "Split": {"payout": 17, "inside": True, "selection_count": 2},
-    "Street": {"payout": 11, "inside": True, "selection_count": 3},
-    "Corner": {"payout": 8, "inside": True, "selection_count": 4},
-    "Six Line": {"payout": 5, "inside": True, "selection_count": 6},
-    "Red/Black": {"payout": 1, "inside": False, "selection_count": None},
-    "Gerade/Ungerade": {"payout": 1, "inside": False, "selection_count": None},
-    "1-18/19-36": {"payout": 1, "inside": False, "selection_count": None},
-    "Dutzend": {"payout": 2, "inside": False, "selection_count": None},
-    "Kolonne": {"payout": 2, "inside": False, "selection_count": None},
+OUTSIDE_MASKS: Dict[FrozenSet[str], int] = {
+    selection: sum(1 << SLOT_BIT[number] for number in selection) for selection in OUTSIDE_SELECTIONS.values()
+}
+RED_MASK = OUTSIDE_MASKS[RED_SEL]
+BLACK_MASK = OUTSIDE_MASKS[BLACK_SEL]
+
+
+@dataclass(slots=True, frozen=True)
+class BetMeta:
+    payout: int
+    inside: bool
+    selection_count: Optional[int]
+
+
+BET_TYPES: Dict[str, BetMeta] = {
+    "Straight": BetMeta(payout=35, inside=True, selection_count=1),
+    "Split": BetMeta(payout=17, inside=True, selection_count=2),
+    "Street": BetMeta(payout=11, inside=True, selection_count=3),
+    "Corner": BetMeta(payout=8, inside=True, selection_count=4),
+    "Six Line": BetMeta(payout=5, inside=True, selection_count=6),
+    "Red/Black": BetMeta(payout=1, inside=False, selection_count=None),
+    "Gerade/Ungerade": BetMeta(payout=1, inside=False, selection_count=None),
+    "1-18/19-36": BetMeta(payout=1, inside=False, selection_count=None),
+    "Dutzend": BetMeta(payout=2, inside=False, selection_count=None),
+    "Kolonne": BetMeta(payout=2, inside=False, selection_count=None),
 }
+BET_TYPE_NAMES = tuple(BET_TYPES)
+
+PAYOUT_OVERVIEW = (
+    "Innenfelder (min 0,50€)\n"
+    "- Straight (eine Zahl, inkl. 0/00): Auszahlung 35:1\n"
+    "- Split (zwei Zahlen): Auszahlung 17:1\n"
+    "- Street (drei Zahlen in einer Reihe): Auszahlung 11:1\n"
+    "- Corner (vier Zahlen im Block): Auszahlung 8:1\n"
+    "- Six Line (sechs Zahlen, zwei Reihen): Auszahlung 5:1\n\n"
+    "Außenfelder (min 5€)\n"
+    "- Red/Black: Auszahlung 1:1\n"
+    "- Gerade/Ungerade: Auszahlung 1:1\n"
+    "- 1-18/19-36: Auszahlung 1:1\n"
+    "- Dutzend (1-12, 13-24, 25-36): Auszahlung 2:1\n"
+    "- Kolonne (1, 2, 3): Auszahlung 2:1\n\n"
+    "American Roulette enthält 0 und 00."
+)
 
 THEMES = {
     "light": {
@@ -62,14 +159,46 @@ THEMES = {
     "system": {},
 }
 
+# Looked up along each widget class's MRO. ttk widgets are styled through ttk.Style,
+# so they map to None even where they subclass a classic tk widget.
+WIDGET_THEMERS: Dict[type, Optional[Callable[[tk.Misc, dict], None]]] = {
+    ttk.Widget: None,
+    tk.Frame: lambda widget, palette: widget.configure(bg=palette["bg"]),
+    tk.LabelFrame: lambda widget, palette: widget.configure(bg=palette["bg"]),
+    tk.Toplevel: lambda widget, palette: widget.configure(bg=palette["bg"]),
+    tk.Label: lambda widget, palette: widget.configure(bg=palette["bg"], fg=palette["text"]),
+    tk.Button: lambda widget, palette: widget.configure(
+        bg=palette["panel"], fg=palette["text"], activebackground=palette["accent"]
+    ),
+    tk.Entry: lambda widget, palette: widget.configure(
+        bg=palette["panel"], fg=palette["text"], insertbackground=palette["text"]
+    ),
+    tk.Listbox: lambda widget, palette: widget.configure(bg=palette["panel"], fg=palette["text"]),
+    tk.Text: lambda widget, palette: widget.configure(
+        bg=palette["panel"], fg=palette["text"], insertbackground=palette["text"]
+    ),
+    tk.Canvas: lambda widget, palette: widget.configure(bg=palette["canvas"]),
+}
+WIDGET_THEMER_CACHE: Dict[type, Optional[Callable[[tk.Misc, dict], None]]] = {}
 
-@dataclass
+
+@dataclass(slots=True, frozen=True)
 class Bet:
     bet_type: str
-    amount: float
-    selection: List[str]
+    amount: int
+    selection: Union[Tuple[str, ...], FrozenSet[str]]
+    selection_str: str
     payout_ratio: int
     is_inside: bool
+    mask: int
+
+
+def widget_themer(widget_type: type) -> Optional[Callable[[tk.Misc, dict], None]]:
+    if widget_type not in WIDGET_THEMER_CACHE:
+        WIDGET_THEMER_CACHE[widget_type] = next(
+            (WIDGET_THEMERS[base] for base in widget_type.__mro__ if base in WIDGET_THEMERS), None
+        )
+    return WIDGET_THEMER_CACHE[widget_type]
 
 
 def ensure_data_files() -> None:
@@ -93,20 +222,102 @@ def ensure_data_files() -> None:
 
 
 def load_json(path: str) -> dict:
+    if orjson is not None:
+        with open(path, "rb") as file:
+            if os.fstat(file.fileno()).st_size < mmap.PAGESIZE:
+                return orjson.loads(file.read())
+            # Larger files are parsed straight from the mapped pages without a copy.
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped, memoryview(mapped) as view:
+                return orjson.loads(view)
     with open(path, "r", encoding="utf-8") as file:
         return json.load(file)
 
 
-def save_json(path: str, data: dict) -> None:
-    with open(path, "w", encoding="utf-8") as file:
-        json.dump(data, file, indent=2)
+def save_json(path: str, data: dict, indent: Optional[int] = 2) -> None:
+    # Write next to the target and swap it in, so a crash never leaves a truncated file.
+    tmp_path = path + ".tmp"
+    if orjson is not None:
+        with open(tmp_path, "wb") as file:
+            file.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else 0))
+    else:
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(data, file, indent=indent)
+    os.replace(tmp_path, path)
+
+
+def migrate_balances(users: dict) -> bool:
+    migrated = False
+    for user in users.values():
+        # Balances used to be stored as euro floats.
+        if isinstance(user.get("balance"), float):
+            user["balance"] = euros_to_cents(user["balance"])
+            migrated = True
+    return migrated
+
+
+def derive_key(password: str, salt: bytes, params: dict) -> bytes:
+    return hashlib.scrypt(
+        password.encode("utf-8"),
+        salt=salt,
+        n=params["n"],
+        r=params["r"],
+        p=params["p"],
+        maxmem=SCRYPT_MAXMEM,
+        dklen=32,
+    )
+
+
+def create_password_record(password: str) -> dict:
+    salt = os.urandom(SALT_BYTES)
+    return {
+        "salt": salt.hex(),
+        "kdf": PASSWORD_KDF,
+        **SCRYPT_PARAMS,
+        "hash": derive_key(password, salt, SCRYPT_PARAMS).hex(),
+    }
+
+
+def needs_rehash(user: dict) -> bool:
+    if user.get("kdf") != PASSWORD_KDF:
+        return True
+    return any(user.get(name) != value for name, value in SCRYPT_PARAMS.items())
+
+
+def auth_token(password: str) -> bytes:
+    mac = AUTH_CACHE_MAC.copy()
+    mac.update(password.encode("utf-8"))
+    return mac.digest()
+
+
+def verify_password(user: dict, password: str) -> bool:
+    if user.get("kdf") == PASSWORD_KDF:
+        derived = derive_key(password, bytes.fromhex(user["salt"]), user)
+        return hmac.compare_digest(derived, bytes.fromhex(user["hash"]))
+    # Accounts registered before the KDF switch only carry an unsalted SHA-256.
+    legacy_hash = user.get("password_hash")
+    if legacy_hash is None:
+        return False
+    return hmac.compare_digest(legacy_hash, hashlib.sha256(password.encode("utf-8")).hexdigest())
+
 
+def euros_to_cents(euros: float) -> int:
+    return int(round(euros * 100))
 
-def hash_password(password: str) -> str:
-    return hashlib.sha256(password.encode("utf-8")).hexdigest()
 
+def parse_amount(raw: str) -> int:
+    euros = float(raw.strip().rstrip("€").replace(",", "."))
+    if not math.isfinite(euros):
+        raise ValueError(f"amount is not finite: {raw!r}")
+    return euros_to_cents(euros)
 
-def validate_bet_amount(amount: float, is_inside: bool) -> bool:
+
+def fmt_eur(cents: int) -> str:
+    sign = "-" if cents < 0 else ""
+    cents = abs(cents)
+    return f"{sign}{cents // 100},{cents % 100:02d}€"
+
+
+def validate_bet_amount(amount: int, is_inside: bool) -> bool:
     if amount not in ALLOWED_BETS:
         return False
     if is_inside and amount < MIN_INSIDE_BET:
@@ -116,62 +327,157 @@ def validate_bet_amount(amount: float, is_inside: bool) -> bool:
     return True
 
 
-def selection_from_outside(bet_type: str, selection: str) -> Optional[List[str]]:
-    if bet_type == "Red/Black":
-        if selection == "red":
-            return [str(n) for n in RED_NUMBERS]
-        if selection == "black":
-            return [str(n) for n in BLACK_NUMBERS]
-        return None
-    if bet_type == "Gerade/Ungerade":
-        if selection == "gerade":
-            return [str(n) for n in range(2, 37, 2)]
-        if selection == "ungerade":
-            return [str(n) for n in range(1, 37, 2)]
-        return None
-    if bet_type == "1-18/19-36":
-        if selection == "1-18":
-            return [str(n) for n in range(1, 19)]
-        if selection == "19-36":
-            return [str(n) for n in range(19, 37)]
-        return None
-    if bet_type == "Dutzend":
-        if selection == "1-12":
-            return [str(n) for n in range(1, 13)]
-        if selection == "13-24":
-            return [str(n) for n in range(13, 25)]
-        if selection == "25-36":
-            return [str(n) for n in range(25, 37)]
+def parse_selection(raw: str, count: int) -> Optional[Tuple[str, ...]]:
+    tokens = tuple(token.strip() for token in raw.split(","))
+    if len(tokens) != count or not WHEEL_SET.issuperset(tokens):
         return None
-    if bet_type == "Kolonne":
-        if selection == "1":
-            return [str(n) for n in range(1, 37, 3)]
-        if selection == "2":
-            return [str(n) for n in range(2, 37, 3)]
-        if selection == "3":
-            return [str(n) for n in range(3, 37, 3)]
-        return None
-    return None
+    return tokens
 
 
-def resolve_bets(bets: List[Bet], result: str) -> Tuple[float, List[str]]:
-    total_change = 0.0
-    summaries = []
-    for bet in bets:
-        if result in bet.selection:
+def selection_from_outside(bet_type: str, selection: str) -> Optional[FrozenSet[str]]:
+    return OUTSIDE_SELECTIONS.get((bet_type, selection))
+
+
+def selection_mask(selection: Collection[str]) -> int:
+    mask = 0
+    for number in selection:
+        mask |= 1 << SLOT_BIT[number]
+    return mask
+
+
+def format_selection(selection: Collection[str]) -> str:
+    return ", ".join(sorted(selection, key=SLOT_BIT.__getitem__))
+
+
+def resolve_bets(bets: List[Bet], result: str, verbose: bool = True) -> Tuple[int, List[str]]:
+    total_change = 0
+    summaries = [""] * len(bets) if verbose else []
+    result_bit = 1 << SLOT_BIT[result]
+    for idx, bet in enumerate(bets):
+        if bet.mask & result_bit:
             winnings = bet.amount * bet.payout_ratio
             total_change += winnings
-            summaries.append(
-                f"Gewinn: {bet.bet_type} ({', '.join(bet.selection)}) +{winnings:.2f}€"
-            )
+            if verbose:
+                summaries[idx] = f"Gewinn: {bet.bet_type} ({bet.selection_str}) +{fmt_eur(winnings)}"
         else:
             total_change -= bet.amount
-            summaries.append(
-                f"Verlust: {bet.bet_type} ({', '.join(bet.selection)}) -{bet.amount:.2f}€"
-            )
+            if verbose:
+                summaries[idx] = f"Verlust: {bet.bet_type} ({bet.selection_str}) -{fmt_eur(bet.amount)}"
     return total_change, summaries
 
 
+def resolve_bets_batch(bets: List[Bet], results: List[str]) -> List[int]:
+    # The net change only depends on the slot that was hit, so resolve every
+    # slot once and turn each result into a table lookup. Every bet loses its
+    # stake by default; only the slots in its mask get stake plus winnings back.
+    net_by_slot = [-sum(bet.amount for bet in bets)] * len(WHEEL)
+    for bet in bets:
+        returned = bet.amount * (bet.payout_ratio + 1)
+        mask = bet.mask
+        while mask:
+            lowest = mask & -mask
+            net_by_slot[lowest.bit_length() - 1] += returned
+            mask ^= lowest
+    return [net_by_slot[SLOT_BIT[result]] for result in results]
+
+
+def spin_schedule(final_idx: int, steps: int) -> List[Tuple[int, int]]:
+    # One (delay_ms, wheel_idx) frame per tick, slowing down over the last 15 ticks
+    # and ending on final_idx.
+    frames = []
+    delay_ms = 70
+    start_idx = final_idx - steps
+    for step in range(1, steps + 1):
+        if steps - step < 15:
+            delay_ms = min(200, delay_ms + 15)
+        frames.append((delay_ms, (start_idx + step) % len(WHEEL)))
+    return frames
+
+
+class RouletteGame:
+    def __init__(self, rng: Optional[random.Random] = None) -> None:
+        self._rng = rng or random.Random()
+        self._choice = self._rng.choice
+        self._choices = self._rng.choices
+        self._wheel = WHEEL
+
+    def spin(self) -> str:
+        return self._choice(self._wheel)
+
+    def spin_many(self, count: int) -> List[str]:
+        return self._choices(self._wheel, k=count)
+
+    def simulate(self, bets: List[Bet], rounds: int) -> List[int]:
+        return resolve_bets_batch(bets, self.spin_many(rounds))
+
+
+class UserStore:
+    def __init__(self, users_path: str, journal_path: str, snapshot_every: int = SNAPSHOT_EVERY) -> None:
+        self.users_path = users_path
+        self.journal_path = journal_path
+        self.snapshot_every = snapshot_every
+        self.pending_writes = 0
+        self.users: dict = {}
+        self.reload()
+
+    def reload(self) -> None:
+        self.users = load_json(self.users_path)
+        migrated = migrate_balances(self.users)
+        if self.replay_journal() or migrated:
+            self.save()
+        else:
+            self.clear_journal()
+
+    def add_user(self, username: str, record: dict) -> None:
+        self.users[username] = record
+        self.save()
+
+    def change_balance(self, username: str, delta: int) -> None:
+        user = self.users[username]
+        user["balance"] += delta
+        self.append_journal(username, user["balance"])
+        self.pending_writes += 1
+        if self.pending_writes >= self.snapshot_every:
+            self.save()
+
+    def save(self) -> None:
+        save_json(self.users_path, self.users, indent=None)
+        self.clear_journal()
+        self.pending_writes = 0
+
+    def flush(self) -> None:
+        if self.pending_writes:
+            self.save()
+
+    def append_journal(self, username: str, balance: int) -> None:
+        # Journal the new balance rather than the delta so replaying twice is harmless.
+        entry = {"user": username, "balance": balance, "ts": time.time()}
+        with open(self.journal_path, "a", encoding="utf-8") as file:
+            file.write(json.dumps(entry) + "\n")
+
+    def replay_journal(self) -> bool:
+        if not os.path.exists(self.journal_path):
+            return False
+        replayed = False
+        with open(self.journal_path, "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A crash mid-write can leave a truncated last line behind.
+                    continue
+                user = self.users.get(entry.get("user"))
+                if user is None or "balance" not in entry:
+                    continue
+                user["balance"] = entry["balance"]
+                replayed = True
+        return replayed
+
+    def clear_journal(self) -> None:
+        if os.path.exists(self.journal_path):
+            open(self.journal_path, "w", encoding="utf-8").close()
+
+
 class RouletteApp(tk.Tk):
     def __init__(self) -> None:
         super().__init__()
@@ -180,7 +486,7 @@ class RouletteApp(tk.Tk):
         self.resizable(False, False)
 
         ensure_data_files()
-        self.users = load_json(USERS_FILE)
+        self.user_store = UserStore(USERS_FILE, JOURNAL_FILE)
         self.config = load_json(CONFIG_FILE)
         if "ui_theme" not in self.config:
             self.config["ui_theme"] = "system"
@@ -193,10 +499,14 @@ class RouletteApp(tk.Tk):
             "canvas": "white",
             "wheel": "#1b5e20",
         }
+        self.game = RouletteGame()
+        self.validate_cache: Dict[str, bytes] = {}
         self.current_user: Optional[str] = None
         self.current_bets: List[Bet] = []
         self.result_number: Optional[str] = None
         self.theme_var = tk.StringVar(value=self.config.get("ui_theme", "system"))
+        self.style = ttk.Style(self)
+        self.current_theme: Optional[str] = None
 
         self.frames: Dict[str, tk.Frame] = {}
         container = tk.Frame(self)
@@ -215,14 +525,27 @@ class RouletteApp(tk.Tk):
         frame = self.frames[name]
         frame.tkraise()
 
-    def refresh_users(self) -> None:
-        self.users = load_json(USERS_FILE)
-
-    def refresh_config(self) -> None:
-        self.config = load_json(CONFIG_FILE)
-
-    def save_users(self) -> None:
-        save_json(USERS_FILE, self.users)
+    @property
+    def users(self) -> dict:
+        return self.user_store.users
+
+    def check_credentials(self, username: str, password: str) -> bool:
+        user = self.users.get(username)
+        if not user:
+            return False
+        token = auth_token(password)
+        cached = self.validate_cache.get(username)
+        if cached is not None and hmac.compare_digest(cached, token):
+            return True
+        if not verify_password(user, password):
+            return False
+        if needs_rehash(user):
+            # Upgrade legacy SHA-256 records and outdated scrypt parameters on a successful login.
+            user.pop("password_hash", None)
+            user.update(create_password_record(password))
+            self.user_store.save()
+        self.validate_cache[username] = token
+        return True
 
     def save_config(self) -> None:
         save_json(CONFIG_FILE, self.config)
@@ -270,6 +593,8 @@ class RouletteApp(tk.Tk):
 
     def on_theme_change(self) -> None:
         new_theme = self.theme_var.get()
+        if new_theme == self.current_theme:
+            return
         self.config["ui_theme"] = new_theme
         self.save_config()
         self.apply_theme(new_theme)
@@ -310,14 +635,14 @@ class RouletteApp(tk.Tk):
         return THEMES[theme_name]
 
     def apply_theme(self, theme_name: str) -> None:
-        palette = self.get_palette(theme_name)
-    def apply_theme(self, theme_name: str) -> None:
+        if theme_name == self.current_theme:
+            return
         if theme_name == "system":
             palette = self.system_palette
         else:
             palette = THEMES[theme_name]
         self.configure(bg=palette["bg"])
-        style = ttk.Style(self)
+        style = self.style
         style.configure("TLabel", background=palette["bg"], foreground=palette["text"])
         style.configure("TFrame", background=palette["bg"])
         style.configure("TButton", background=palette["panel"], foreground=palette["text"])
@@ -339,33 +664,20 @@ class RouletteApp(tk.Tk):
             foreground=[("readonly", palette["text"])],
             background=[("readonly", palette["panel"])],
         )
-        style.configure("TCombobox", fieldbackground=palette["panel"], foreground=palette["text"])
         for frame in self.frames.values():
             self.update_widget_colors(frame, palette)
             if isinstance(frame, GameFrame):
                 frame.update_theme(palette)
+        self.current_theme = theme_name
 
     def update_widget_colors(self, widget: tk.Widget, palette: dict) -> None:
-        if isinstance(widget, ttk.Widget):
-            for child in widget.winfo_children():
-                self.update_widget_colors(child, palette)
-            return
-        if isinstance(widget, (tk.Frame, tk.LabelFrame, tk.Toplevel)):
-            widget.configure(bg=palette["bg"])
-        elif isinstance(widget, tk.Label):
-            widget.configure(bg=palette["bg"], fg=palette["text"])
-        elif isinstance(widget, tk.Button):
-            widget.configure(bg=palette["panel"], fg=palette["text"], activebackground=palette["accent"])
-        elif isinstance(widget, tk.Entry):
-            widget.configure(bg=palette["panel"], fg=palette["text"], insertbackground=palette["text"])
-        elif isinstance(widget, tk.Listbox):
-            widget.configure(bg=palette["panel"], fg=palette["text"])
-        elif isinstance(widget, tk.Text):
-            widget.configure(bg=palette["panel"], fg=palette["text"], insertbackground=palette["text"])
-        elif isinstance(widget, tk.Canvas):
-            widget.configure(bg=palette["canvas"])
-        for child in widget.winfo_children():
-            self.update_widget_colors(child, palette)
+        pending = deque([widget])
+        while pending:
+            current = pending.popleft()
+            themer = widget_themer(type(current))
+            if themer is not None:
+                themer(current, palette)
+            pending.extend(current.winfo_children())
 
 
 class LoginFrame(tk.Frame):
@@ -399,8 +711,7 @@ class LoginFrame(tk.Frame):
     def login(self) -> None:
         username = self.username_entry.get().strip()
         password = self.password_entry.get()
-        user = self.app.users.get(username)
-        if not user or user.get("password_hash") != hash_password(password):
+        if not self.app.check_credentials(username, password):
             messagebox.showerror("Login fehlgeschlagen", "Benutzername oder Passwort falsch.")
             return
         self.app.current_user = username
@@ -410,8 +721,7 @@ class LoginFrame(tk.Frame):
     def admin_login(self) -> None:
         username = self.username_entry.get().strip()
         password = self.password_entry.get()
-        user = self.app.users.get(username)
-        if not user or user.get("password_hash") != hash_password(password):
+        if not self.app.check_credentials(username, password):
             messagebox.showerror("Login fehlgeschlagen", "Benutzername oder Passwort falsch.")
             return
         if username not in self.app.config.get("admin_users", []):
@@ -455,11 +765,9 @@ class RegisterFrame(tk.Frame):
         if username in self.app.users:
             messagebox.showerror("Fehler", "Benutzername existiert bereits.")
             return
-        start_balance = self.app.config.get("default_start_balance", 100.0)
-        self.app.users[username] = {"password_hash": hash_password(password), "balance": start_balance}
-        self.app.save_users()
-        messagebox.showinfo("Registrierung", f"Registrierung abgeschlossen. Startkapital: {start_balance:.2f}€")
-        self.app.refresh_users()
+        start_balance = euros_to_cents(self.app.config.get("default_start_balance", 100.0))
+        self.app.user_store.add_user(username, {**create_password_record(password), "balance": start_balance})
+        messagebox.showinfo("Registrierung", f"Registrierung abgeschlossen. Startkapital: {fmt_eur(start_balance)}")
         self.app.show_frame("LoginFrame")
 
 
@@ -484,24 +792,22 @@ class AdminFrame(tk.Frame):
         tk.Button(btn_row, text="Zurück", width=15, command=self.back).grid(row=0, column=1, padx=5)
 
     def refresh(self) -> None:
-        self.balance_var.set(f"{self.app.config.get('default_start_balance', 100.0):.2f}")
+        self.balance_var.set(fmt_eur(euros_to_cents(self.app.config.get("default_start_balance", 100.0))))
 
     def save_balance(self) -> None:
-        raw = self.balance_var.get().replace(",", ".")
         try:
-            amount = float(raw)
+            amount = parse_amount(self.balance_var.get())
         except ValueError:
             messagebox.showerror("Fehler", "Ungültiger Betrag.")
             return
         if amount <= 0:
             messagebox.showerror("Fehler", "Betrag muss größer 0 sein.")
             return
-        self.app.config["default_start_balance"] = round(amount, 2)
+        self.app.config["default_start_balance"] = amount / 100
         self.app.save_config()
-        messagebox.showinfo("Gespeichert", f"Startkapital aktualisiert: {amount:.2f}€")
+        messagebox.showinfo("Gespeichert", f"Startkapital aktualisiert: {fmt_eur(amount)}")
 
     def back(self) -> None:
-        self.app.refresh_config()
         self.app.show_frame("LoginFrame")
 
 
@@ -511,22 +817,7 @@ class OverviewFrame(tk.Frame):
         self.app = app
         tk.Label(self, text="Gewinnübersicht & Feld-Erklärung", font=("Helvetica", 16, "bold")).pack(pady=15)
         app.add_theme_selector(self)
-        text = (
-            "Innenfelder (min 0,50€)\n"
-            "- Straight (eine Zahl, inkl. 0/00): Auszahlung 35:1\n"
-            "- Split (zwei Zahlen): Auszahlung 17:1\n"
-            "- Street (drei Zahlen in einer Reihe): Auszahlung 11:1\n"
-            "- Corner (vier Zahlen im Block): Auszahlung 8:1\n"
-            "- Six Line (sechs Zahlen, zwei Reihen): Auszahlung 5:1\n\n"
-            "Außenfelder (min 5€)\n"
-            "- Red/Black: Auszahlung 1:1\n"
-            "- Gerade/Ungerade: Auszahlung 1:1\n"
-            "- 1-18/19-36: Auszahlung 1:1\n"
-            "- Dutzend (1-12, 13-24, 25-36): Auszahlung 2:1\n"
-            "- Kolonne (1, 2, 3): Auszahlung 2:1\n\n"
-            "American Roulette enthält 0 und 00."
-        )
-        label = tk.Label(self, text=text, justify="left")
+        label = tk.Label(self, text=PAYOUT_OVERVIEW, justify="left")
         label.pack(padx=20, pady=10)
 
         tk.Button(self, text="Zurück", width=15, command=lambda: app.show_frame("LoginFrame")).pack(pady=10)
@@ -538,8 +829,9 @@ class GameFrame(tk.Frame):
         self.app = app
         self.spin_running = False
         self.spin_index = 0
-        self.spin_speed_ms = 70
-        self.remaining_spin_steps = 0
+        self.spin_frames: List[Tuple[int, int]] = []
+        self.spin_frame_pos = 0
+        self.animation_rng = random.Random()
         self.wheel_color = THEMES["light"]["wheel"]
         self.canvas_color = THEMES["light"]["canvas"]
 
@@ -562,17 +854,17 @@ class GameFrame(tk.Frame):
 
         tk.Label(left, text="Wette platzieren", font=("Helvetica", 14, "bold")).pack(pady=10)
         self.bet_type_var = tk.StringVar(value="Straight")
-        self.amount_var = tk.DoubleVar(value=ALLOWED_BETS[0])
+        self.amount_var = tk.StringVar(value=fmt_eur(ALLOWED_BETS[0]))
         self.selection_var = tk.StringVar()
 
         tk.Label(left, text="Wettart").pack(anchor="w")
-        ttk.Combobox(left, values=list(BET_TYPES.keys()), textvariable=self.bet_type_var, state="readonly").pack(
+        ttk.Combobox(left, values=BET_TYPE_NAMES, textvariable=self.bet_type_var, state="readonly").pack(
             fill="x", pady=5
         )
         tk.Label(left, text="Auswahl (Zahl(en) oder Text)").pack(anchor="w")
         tk.Entry(left, textvariable=self.selection_var).pack(fill="x", pady=5)
         tk.Label(left, text="Einsatz (€)").pack(anchor="w")
-        ttk.Combobox(left, values=[str(bet) for bet in ALLOWED_BETS], textvariable=self.amount_var, state="readonly").pack(
+        ttk.Combobox(left, values=[fmt_eur(bet) for bet in ALLOWED_BETS], textvariable=self.amount_var, state="readonly").pack(
             fill="x", pady=5
         )
         tk.Button(left, text="Wette hinzufügen", command=self.add_bet).pack(fill="x", pady=5)
@@ -603,33 +895,35 @@ class GameFrame(tk.Frame):
         self.draw_wheel()
 
     def refresh(self) -> None:
-        username = self.app.current_user or ""
-        balance = self.app.users.get(username, {}).get("balance", 0.0)
-        self.user_var.set(f"Spieler: {username}")
-        self.balance_var.set(f"Kontostand: {balance:.2f}€")
-        self.bet_list.delete(0, tk.END)
-        self.app.current_bets = []
+        self.user_var.set(f"Spieler: {self.app.current_user or ''}")
+        self.refresh_between_spins()
         self.result_text.configure(state="normal")
         self.result_text.delete("1.0", tk.END)
         self.result_text.configure(state="disabled")
         self.number_label.config(text="Aktuelles Feld: -")
 
+    def refresh_between_spins(self) -> None:
+        balance = self.app.users.get(self.app.current_user or "", {}).get("balance", 0)
+        self.balance_var.set(f"Kontostand: {fmt_eur(balance)}")
+        self.bet_list.delete(0, tk.END)
+        self.app.current_bets = []
+
     def logout(self) -> None:
+        self.app.user_store.flush()
         self.app.current_user = None
-        self.app.refresh_users()
         self.app.show_frame("LoginFrame")
 
     def add_bet(self) -> None:
         bet_type = self.bet_type_var.get()
         selection_raw = self.selection_var.get().strip()
         try:
-            amount = float(str(self.amount_var.get()).replace(",", "."))
+            amount = parse_amount(self.amount_var.get())
         except ValueError:
             messagebox.showerror("Fehler", "Ungültiger Betrag.")
             return
 
         meta = BET_TYPES[bet_type]
-        is_inside = meta["inside"]
+        is_inside = meta.inside
         if not validate_bet_amount(amount, is_inside):
             if is_inside:
                 messagebox.showerror("Fehler", "Innenfeld min 0,50€, erlaubte Einsätze: 0,50/1/2/5/10/25.")
@@ -638,11 +932,11 @@ class GameFrame(tk.Frame):
             return
 
         if is_inside:
-            selections = [item.strip() for item in selection_raw.split(",") if item.strip()]
-            needed = meta["selection_count"]
-            if len(selections) != needed or any(item not in WHEEL for item in selections):
+            selections = parse_selection(selection_raw, meta.selection_count)
+            if selections is None:
                 messagebox.showerror("Fehler", "Ungültige Auswahl für diese Wettart.")
                 return
+            mask = selection_mask(selections)
         else:
             if not selection_raw:
                 messagebox.showerror("Fehler", "Bitte eine Auswahl eingeben.")
@@ -651,9 +945,10 @@ class GameFrame(tk.Frame):
             if selections is None:
                 messagebox.showerror("Fehler", "Ungültige Auswahl für diese Wettart.")
                 return
+            mask = OUTSIDE_MASKS[selections]
 
         username = self.app.current_user or ""
-        balance = self.app.users.get(username, {}).get("balance", 0.0)
+        balance = self.app.users.get(username, {}).get("balance", 0)
         if balance < amount:
             messagebox.showerror("Fehler", "Nicht genügend Guthaben.")
             return
@@ -662,11 +957,13 @@ class GameFrame(tk.Frame):
             bet_type=bet_type,
             amount=amount,
             selection=selections,
-            payout_ratio=meta["payout"],
+            selection_str=format_selection(selections),
+            payout_ratio=meta.payout,
             is_inside=is_inside,
+            mask=mask,
         )
         self.app.current_bets.append(bet)
-        self.bet_list.insert(tk.END, f"{bet_type}: {amount:.2f}€ -> {', '.join(selections)}")
+        self.bet_list.insert(tk.END, f"{bet_type}: {fmt_eur(amount)} -> {bet.selection_str}")
         self.selection_var.set("")
 
     def remove_last_bet(self) -> None:
@@ -685,21 +982,19 @@ class GameFrame(tk.Frame):
         self.result_text.configure(state="normal")
         self.result_text.delete("1.0", tk.END)
         self.result_text.configure(state="disabled")
-        self.remaining_spin_steps = random.randint(45, 70)
-        self.spin_speed_ms = 70
+        result = self.app.game.spin()
+        self.spin_frames = spin_schedule(SLOT_BIT[result], self.animation_rng.randint(45, 70))
+        self.spin_frame_pos = 0
         self.animate_spin()
 
     def animate_spin(self) -> None:
-        if self.remaining_spin_steps <= 0:
+        if self.spin_frame_pos >= len(self.spin_frames):
             self.finish_spin()
             return
-        self.spin_index = (self.spin_index + 1) % len(WHEEL)
-        current_number = WHEEL[self.spin_index]
-        self.highlight_number(current_number)
-        self.remaining_spin_steps -= 1
-        if self.remaining_spin_steps < 15:
-            self.spin_speed_ms = min(200, self.spin_speed_ms + 15)
-        self.after(self.spin_speed_ms, self.animate_spin)
+        delay_ms, self.spin_index = self.spin_frames[self.spin_frame_pos]
+        self.spin_frame_pos += 1
+        self.highlight_number(self.spin_index)
+        self.after(delay_ms, self.animate_spin)
 
     def finish_spin(self) -> None:
         self.spin_running = False
@@ -711,23 +1006,17 @@ class GameFrame(tk.Frame):
     def resolve_and_display(self, result: str) -> None:
         username = self.app.current_user or ""
         total_change, summaries = resolve_bets(self.app.current_bets, result)
-        self.app.users[username]["balance"] = round(self.app.users[username]["balance"] + total_change, 2)
-        self.app.save_users()
-        self.app.refresh_users()
-        self.refresh()
+        self.app.user_store.change_balance(username, total_change)
+        self.refresh_between_spins()
 
         self.result_text.configure(state="normal")
-        self.result_text.insert(tk.END, f"Kugel fällt auf: {result}\n\n")
-        for summary in summaries:
-            self.result_text.insert(tk.END, f"{summary}\n")
+        self.result_text.insert(tk.END, f"Kugel fällt auf: {result}\n\n" + "\n".join(summaries) + "\n")
         self.result_text.configure(state="disabled")
-        self.app.current_bets = []
-        self.bet_list.delete(0, tk.END)
 
     def draw_wheel(self) -> None:
         self.wheel_canvas.delete("all")
-        center = 190
-        radius = 160
+        center = WHEEL_CENTER
+        radius = WHEEL_RADIUS
         self.wheel_canvas.create_oval(
             center - radius,
             center - radius,
@@ -735,31 +1024,17 @@ class GameFrame(tk.Frame):
             center + radius,
             fill=self.wheel_color,
         )
-        for idx, number in enumerate(WHEEL):
-            angle = (360 / len(WHEEL)) * idx
-            x = center + (radius - 20) * math.cos(math.radians(angle))
-            y = center + (radius - 20) * math.sin(math.radians(angle))
-            fill = "white"
-            if number not in {"0", "00"}:
-                value = int(number)
-                if value in RED_NUMBERS:
-                    fill = "red"
-                elif value in BLACK_NUMBERS:
-                    fill = "black"
+        for idx, (number, (x, y)) in enumerate(zip(WHEEL, WHEEL_XY)):
+            bit = 1 << idx
+            fill = "red" if RED_MASK & bit else "black" if BLACK_MASK & bit else "white"
             self.wheel_canvas.create_text(x, y, text=number, fill=fill, font=("Helvetica", 9, "bold"))
         self.highlight_marker = self.wheel_canvas.create_oval(
             center - 12, center - radius - 5, center + 12, center - radius + 19, fill="#fbc02d"
         )
 
-    def highlight_number(self, number: str) -> None:
-        center = 190
-        radius = 160
-        idx = WHEEL.index(number)
-        angle = (360 / len(WHEEL)) * idx
-        x = center + (radius - 20) * math.cos(math.radians(angle))
-        y = center + (radius - 20) * math.sin(math.radians(angle))
-        self.wheel_canvas.coords(self.highlight_marker, x - 12, y - 12, x + 12, y + 12)
-        self.number_label.config(text=f"Aktuelles Feld: {number}")
+    def highlight_number(self, idx: int) -> None:
+        self.wheel_canvas.coords(self.highlight_marker, *WHEEL_MARKER_BOXES[idx])
+        self.number_label.config(text=f"Aktuelles Feld: {WHEEL[idx]}")
 
     def update_theme(self, palette: dict) -> None:
         self.canvas_color = palette["canvas"]
@@ -770,7 +1045,10 @@ class GameFrame(tk.Frame):
 
 def main() -> None:
     app = RouletteApp()
-    app.mainloop()
+    try:
+        app.mainloop()
+    finally:
+        app.user_store.flush()
 
 
 if __name__ == "__main__":